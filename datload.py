@@ -1,35 +1,40 @@
 #! python3
 import sys, os
-if sys.version_info < (3, 5):
-    sys.stdout.write("Python 3.5+ is required")
+if sys.version_info < (3, 8):
+    sys.stdout.write("Python 3.8+ is required")
     sys.exit(1)
 
-import re, glob, math, statistics, json, tempfile, uuid, shutil
-from xml.etree import ElementTree
+import re, glob, math, statistics, tempfile, uuid, shutil, hashlib, zlib, mmap, zipfile, subprocess
 from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from argparse import ArgumentParser
-from pathlib import Path
 
 import patoolib
+import orjson
+from lxml import etree
 from tqdm import tqdm
-import hashfile
+
+DATPATTERN = re.compile(r'\[dat-(?P<platform>.*?)\].*\.dat')
+LISTINGFORMAT = 'slt-indexed'
 
 @contextmanager
-def tempdir():
+def temproot():
     unique = uuid.uuid4().hex
     temp = tempfile.gettempdir()
     temp = os.path.join(temp, unique)
-    os.makedirs(temp)
     try:
         yield temp
     finally:
         shutil.rmtree(temp, ignore_errors=True)
 
 @contextmanager
-def tempzip(zipfile):
-    with tempdir() as zipdir:
+def tempzip(zipfile, zipdir):
+    os.makedirs(zipdir)
+    try:
         patoolib.extract_archive(zipfile, outdir=zipdir, verbosity=-1)
         yield zipdir
+    finally:
+        shutil.rmtree(zipdir, ignore_errors=True)
 
 def prettysize(inbytes):
     if inbytes == 0:
@@ -42,51 +47,90 @@ def prettysize(inbytes):
         s = int(s)
     return "%s %s" % (s, size_name[i])
 
+def hashstream(stream, bufsize=1 << 20, limit=None):
+    sha1 = hashlib.sha1()
+    crc = 0
+    hashed = 0
+    while limit is None or hashed < limit:
+        wanted = bufsize
+        if limit is not None:
+            wanted = min(bufsize, limit - hashed)
+        chunk = stream.read(wanted)
+        if not chunk:
+            break
+        sha1.update(chunk)
+        crc = zlib.crc32(chunk, crc)
+        hashed += len(chunk)
+    return f'{crc:08x}', sha1.hexdigest(), hashed
+
+def hashrom(filename, bufsize=1 << 20, maplimit=512 << 20):
+    size = os.path.getsize(filename)
+    if 0 < size <= maplimit:
+        with open(filename, 'rb') as romfile:
+            with mmap.mmap(romfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                sha1 = hashlib.sha1(mapped)
+                crc = zlib.crc32(mapped)
+        return f'{crc:08x}', sha1.hexdigest()
+    with open(filename, 'rb', buffering=0) as romfile:
+        crc, sha1, _ = hashstream(romfile, bufsize)
+    return crc, sha1
+
+def streamjson(filename, items):
+    partial = filename + '.tmp'
+    try:
+        with open(partial, 'wb') as out:
+            out.write(b'{')
+            separator = b'\n'
+            for key, value in items:
+                data = orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+                out.write(separator + b'  ' + orjson.dumps(key) + b': ' + data.replace(b'\n', b'\n  '))
+                separator = b',\n'
+                yield key, value
+            out.write(b'\n}')
+    except BaseException:
+        os.remove(partial)
+        raise
+    os.replace(partial, filename)
+
 def finddats():
     files = glob.glob('*.dat')
-    pattern = r'\[dat-(?P<platform>.*)\].*\.dat'
     datfiles = {}
     for file in files:
-        match = re.match(pattern, file)
+        match = DATPATTERN.match(file)
         if not match:
             continue
         platform = match['platform']
         datfiles[platform] = file
     return datfiles
 
-def printinfo(datinfo):
-    for _, dat in datinfo.items():
-        print(f'Platform [{dat["platform"]}]')
-        print(f'{dat["description"]}')
-        print(f'Version {dat["version"]}')
-        print(f'Props {dat["props"]}')
-        print(f'Props {dat["types"]}')
-        print(f'Found {len(dat["games"])} game definitions')
-        print()
+def printinfo(dat):
+    print(f'Platform [{dat["platform"]}]')
+    print(f'{dat.get("description")}')
+    print(f'Version {dat.get("version")}')
+    print(f'Props {dat["props"]}')
+    print(f'Props {dat["types"]}')
+    print(f'Found {len(dat["games"]["_columns"].get("name", []))} game definitions')
+    print()
 
 def printroms(romfiles):
     bydir = {}
-    for romfile in romfiles:
-        path = Path(romfile)
-        dirname = path.parts[-2]
+    for romfile, rom in romfiles:
+        dirname = os.path.basename(os.path.dirname(romfile))
         if not dirname in bydir:
             bydir[dirname] = []
-        bydir[dirname].append(romfiles[romfile])
+        files = rom['files']
+        romsize = 0
+        for file in files.values():
+            size = file['Size']
+            if not size:
+                continue
+            size = int(size)
+            romsize += size
+        bydir[dirname].append(romsize)
     for romdir in bydir:
         print(f'Rom Set {romdir}')
-        roms = bydir[romdir]
-        print(f'{len(roms)} total files')
-        sizes = []
-        for rom in roms:
-            files = rom['files']
-            romsize = 0
-            for file in files.values():
-                size = file['Size']
-                if not size:
-                    continue
-                size = int(size)
-                romsize += size
-            sizes.append(romsize)
+        sizes = bydir[romdir]
+        print(f'{len(sizes)} total files')
         totalsize = sum(sizes)
         average = statistics.median(sizes)
         average = int(average)
@@ -94,177 +138,349 @@ def printroms(romfiles):
         print(f'Average file is {prettysize(average)}')
         print()
     
-def pulldata(datfiles):
-    dats = {}
-    for platform, datfile in datfiles.items():
-        datinfo = {}
-        dats[platform] = datinfo
-        datinfo['file'] = datfile
-        datinfo['platform'] = platform
-        xml = ElementTree.parse(datfile)
-        header = xml.find('header')
-        for prop in header:
-            datinfo[prop.tag] = prop.text
-        entries = xml.findall('game')
-        if len(entries) < 1:
-            entries = xml.findall('machine')
-        atts = []
-        childs = []
-        games = {}
-        nonmeta = ['rom', 'release', 'device_ref', 'sample', 'biosset', 'disk']
-        for entry in tqdm(entries, desc=f'{platform} dat read', unit='game'):
-            game = {}
-            attrib = entry.attrib
-            name = attrib.get('name')
-            if not name:
-                print('Error! No name for current game')
+def pullgame(entry, games, atts, childs):
+    nonmeta = ['rom', 'release', 'device_ref', 'sample', 'biosset', 'disk']
+    game = {}
+    attrib = entry.attrib
+    name = attrib.get('name')
+    if not name:
+        print('Error! No name for current game')
+        return
+    if name in games:
+        print(f'Duplicate game "{name}" found')
+    games[name] = game
+    for key in attrib:
+        value = attrib[key]
+        key = sys.intern(key)
+        atts.add(key)
+        game[key] = value
+    for child in entry:
+        tag = sys.intern(child.tag)
+        childs.add(tag)
+        if tag in nonmeta:
+            item = {}
+            subatt = child.attrib
+            subname = subatt.get('name')
+            if not subname:
+                print(f'No name found for {tag}')
+                exit()
+            subname = sys.intern(subname)
+            item['type'] = tag
+            taglist = sys.intern(tag + 's')
+            if not taglist in game:
+                game[taglist] = {}
+            game[taglist][subname] = item
+            for key in subatt:
+                item[sys.intern(key)] = subatt[key]
+        else:
+            text = child.text
+            if not text:
+                text = child.get('status')
+                if text:
+                    tag = sys.intern(tag + 'status')
+            game[tag] = text
+
+def addrow(table, row, index):
+    for key, value in row.items():
+        if not key in table:
+            table[key] = [None] * index
+        table[key].append(value)
+    for column in table.values():
+        if len(column) <= index:
+            column.append(None)
+
+def columnize(games):
+    columns = {}
+    tables = {}
+    for index, game in enumerate(games.values()):
+        scalars = {}
+        for key, value in game.items():
+            if not isinstance(value, dict):
+                scalars[key] = value
                 continue
-            if name in games:
-                print(f'Duplicate game "{name}" found')
-            games[name] = game
-            for key in attrib:
-                if not key in atts:
-                    atts.append(key)
-                game[key] = attrib[key]
-            for child in entry:
-                tag = child.tag
-                if not tag in childs:
-                    childs.append(tag)
-                if tag in nonmeta:
-                    item = {}
-                    subatt = child.attrib
-                    subname = subatt.get('name')
-                    if not subname:
-                        print(f'No name found for {tag}')
-                        exit()
-                    item['type'] = tag
-                    taglist = tag + 's'
-                    if not taglist in game:
-                        game[taglist] = {}
-                    game[taglist][subname] = item
-                    for key in subatt:
-                        item[key] = subatt[key]
-                else:
-                    text = child.text
-                    if not text:
-                        text = child.get('status')
-                        if text:
-                            tag = tag + 'status'
-                    game[tag] = text
-        datinfo['games'] = games
-        datinfo['props'] = atts
-        datinfo['types'] = childs
-    return dats
+            if not key in tables:
+                tables[key] = {'game': []}
+            table = tables[key]
+            for item in value.values():
+                row = {itemkey: itemvalue for itemkey, itemvalue in item.items() if itemkey != 'type'}
+                row['game'] = index
+                addrow(table, row, len(table['game']))
+        addrow(columns, scalars, index)
+    tables['_columns'] = columns
+    return tables
+
+def pulldat(platform, datfile):
+    datinfo = {}
+    datinfo['file'] = datfile
+    datinfo['platform'] = platform
+    atts = set()
+    childs = set()
+    games = {}
+    entrytag = None
+    context = etree.iterparse(datfile, events=('end',), tag=('header', 'game', 'machine'), huge_tree=True, remove_comments=True, remove_pis=True)
+    for _, entry in context:
+        if entry.tag == 'header':
+            for prop in entry:
+                datinfo[prop.tag] = prop.text
+        else:
+            if not entrytag:
+                entrytag = entry.tag
+            if entry.tag == entrytag:
+                pullgame(entry, games, atts, childs)
+        entry.clear()
+        while entry.getprevious() is not None:
+            del entry.getparent()[0]
+    datinfo['games'] = columnize(games)
+    datinfo['props'] = sorted(atts)
+    datinfo['types'] = sorted(childs)
+    return platform, datinfo
+
+def pulldata(datfiles):
+    platforms = list(datfiles.keys())
+    files = list(datfiles.values())
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(pulldat, platforms, files)
+        for platform, datinfo in tqdm(results, total=len(datfiles), desc='dat read', unit='dat', unit_scale=True, mininterval=0.5):
+            yield platform, datinfo
     
-def scanroms(locations, types=None):
-    if not types:
-        types = ['.7z', '.zip']
-    romfiles = {}
-    allfiles = []
-    for location in locations:
-        for typ in types:
-            allfiles.extend(glob.glob(f'{location}\\**\\*{typ}'))
-    for allfile in tqdm(allfiles, desc='rom files', unit='file'):
-        listed = None
-        try:
-            listed = patoolib.list_archive(allfile, verbosity=-1)
-        except Exception as e:
-            print(e)
+def parselisting(lines):
+    members = None
+    member = {}
+    for line in lines + ['']:
+        if members is None:
+            if line == '----------':
+                members = []
+            continue
+        if not line.strip():
+            if member:
+                members.append(member)
+            member = {}
+            continue
+        key, separator, value = line.partition(' = ')
+        if separator:
+            member[key.strip()] = value.strip()
+    if members is None:
+        return None
+    for index, member in enumerate(members):
+        member['Index'] = index
+    return {member['Path']: member for member in members if 'Path' in member and 'Size' in member}
+
+def pathkey(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def find7z():
+    for program in ('7z', '7za'):
+        found = patoolib.util.find_program(program)
+        if found:
+            return found
+    sys.exit('Could not find 7z or 7za, install 7-Zip or add it to PATH')
+
+def scanbatch(sevenzip, batch, stats):
+    command = [sevenzip, 'l', '-slt', '-sccUTF-8', '-p-', '-an'] + [f'-ai!{allfile}' for allfile in batch]
+    listed = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    sections = {}
+    section = None
+    for line in listed.decode('utf-8', 'replace').splitlines():
+        if line.startswith('Listing archive: '):
+            section = []
+            sections[pathkey(line[len('Listing archive: '):])] = section
+        elif section is not None:
+            section.append(line)
+    results = []
+    for allfile, stat in zip(batch, stats):
+        lines = sections.get(pathkey(allfile), [])
+        files = parselisting(lines)
+        if files is None:
             print(f'Bad rom file {allfile}')
             continue
-        lines = listed.splitlines()
-        started = False
-        last = []
-        headers = []
-        offsets = [0]
         fileinfo = {}
         fileinfo['path'] = allfile
-        fileinfo['files'] = {}
-        for line in lines:
-            line = str(line, 'utf-8')
-            parts = line.split()
-            dividers = True
-            for part in parts:
-                if not part.startswith('-'):
-                    dividers = False
-                    break
-            if not started and len(parts) > 4:
-                if dividers:
-                    headers = last
-                    validheaders = ['Date', 'Time', 'Attr', 'Size', 'Compressed', 'Name']
-                    if not len(headers) == len(validheaders):
-                        print(f'Headers {headers} do not match valid headers {validheaders}')
-                        exit()
-                    for validheader in validheaders:
-                        if not validheader in headers:
-                            print(f'Header {validheader} is not in headers: {headers}')
-                            exit()
-                    offsets.append(11)
-                    offsets.append(20)
-                    for part in parts[1:len(headers)-2]:
-                        lastoffset = offsets[-1]
-                        lastoffset += len(part) + 1
-                        offsets.append(lastoffset)
-                    offsets[-1] = offsets[-1] + 1
-                    started = True
-                    continue
-            if started:
-                if dividers:
-                    break
-                info = {}
-                for index, offset in enumerate(offsets):
-                    begin = offset
-                    end = len(line)
-                    if index+1 < len(offsets):
-                        end = offsets[index+1]
-                    subline = line[begin:end]
-                    if index < len(offsets) - 1:
-                        subline = subline.strip()
-                    if subline.strip() == '':
-                        continue
-                    info[headers[index]] = subline
-                subname = info['Name']
-                fileinfo['files'][subname] = info
+        fileinfo['_mtime'] = stat.st_mtime_ns
+        fileinfo['_size'] = stat.st_size
+        fileinfo['_listing'] = LISTINGFORMAT
+        fileinfo['files'] = files
+        results.append((allfile, fileinfo))
+    return results
 
-            else:
-                last = parts
-        romfiles[allfile] = fileinfo
-    return romfiles
+def findroms(locations, types):
+    types = tuple(typ.lower() for typ in types)
+    for location in locations:
+        for root, _, files in os.walk(location):
+            for file in files:
+                if file.lower().endswith(types):
+                    yield os.path.join(root, file)
+
+def scanroms(locations, sevenzip, types=None, cachefile='romfiles.json', batchsize=64):
+    if not types:
+        types = ['.7z', '.zip']
+    cached = {}
+    if os.path.exists(cachefile):
+        with open(cachefile, 'rb') as cachejson:
+            cached = orjson.loads(cachejson.read())
+    unchanged = []
+    changed = []
+    stats = []
+    for allfile in findroms(locations, types):
+        stat = os.stat(allfile)
+        fileinfo = cached.get(allfile)
+        if fileinfo and fileinfo.get('_mtime') == stat.st_mtime_ns and fileinfo.get('_size') == stat.st_size and fileinfo.get('_listing') == LISTINGFORMAT:
+            unchanged.append((allfile, fileinfo))
+            continue
+        changed.append(allfile)
+        stats.append(stat)
+    print(f'{len(unchanged)} unchanged rom files, {len(changed)} to scan')
+    yield from unchanged
+    batches = [changed[index:index+batchsize] for index in range(0, len(changed), batchsize)]
+    batchstats = [stats[index:index+batchsize] for index in range(0, len(stats), batchsize)]
+    workers = (os.cpu_count() or 1) * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(scanbatch, [sevenzip] * len(batches), batches, batchstats)
+        with tqdm(total=len(changed), desc='rom files', unit='file', unit_scale=True, mininterval=0.5) as progress:
+            for batch, listed in zip(batches, results):
+                yield from listed
+                progress.update(len(batch))
     
+def sizekey(size, name):
+    name = os.path.basename(name.replace('\\', '/'))
+    return str(size), name.lower()
+
+def indexdat(platform, dat, crcs, sha1s, sizenames):
+    games = dat['games']
+    romtable = games.get('roms', {})
+    names = games['_columns'].get('name', [])
+    count = len(romtable.get('game', []))
+    columns = [romtable.get(key, [None] * count) for key in ('game', 'name', 'size', 'crc', 'sha1')]
+    for game, name, size, crc, sha1 in zip(*columns):
+        found = (platform, names[game], name)
+        if crc:
+            crcs.setdefault(crc.lower(), []).append(found)
+        if sha1:
+            sha1s.setdefault(sha1.lower(), []).append(found)
+        if size and name:
+            sizenames.setdefault(sizekey(size, name), []).append(found)
+
 def matchroms(dats, roms):
-    pass
-            
-def checkroms(roms):
-    checks = {}
-    for romname in tqdm(roms, desc='roms', unit='rom'):
-        try:
-            romcheck = {}
-            romcheck['path'] = romname
-            romcheck['files'] = {}
-            with tempzip(romname) as temp:
-                wildcard = os.path.join(temp, '**\\*')
-                files = glob.glob(wildcard, recursive=True)
-                for file in files:
-                    path = Path(file)
-                    if not path.is_file():
-                        continue
-                    filename = file.replace(temp, '')[1:]
-                    info = {}
-                    size = os.path.getsize(file)
-                    info['size'] = size
-                    info['name'] = filename
-                    crc = hashfile.checksum_file(file, 'crc32')
-                    info['crc'] = crc
-                    sha1 = hashfile.hash_file(file, 'sha1')
-                    info['sha1'] = sha1
-                    romcheck['files'][filename] = info
-            checks[romname] = romcheck
-        except Exception as e:
-            print(e)
-            print(f'Bad rom zip {romname}')
-            continue
-        
-    return checks
+    crcs = {}
+    sha1s = {}
+    sizenames = {}
+    for platform, dat in dats.items():
+        indexdat(platform, dat, crcs, sha1s, sizenames)
+    matched = 0
+    for romfile, rominfo in tqdm(roms.items(), total=len(roms), desc='match', unit='file', unit_scale=True, mininterval=0.5):
+        matches = {}
+        for filename, member in rominfo['files'].items():
+            sha1 = member.get('sha1')
+            crc = member.get('crc') or member.get('CRC')
+            size = member.get('size')
+            if size is None:
+                size = member.get('Size')
+            found = None
+            if sha1:
+                found = sha1s.get(sha1.lower())
+            if not found and crc:
+                found = crcs.get(crc.lower())
+            if not sha1 and not crc and size is not None and size != '':
+                found = sizenames.get(sizekey(size, filename))
+            if found:
+                matches[filename] = [{'platform': platform, 'game': game, 'rom': rom} for platform, game, rom in found]
+        if matches:
+            matched += 1
+            yield romfile, matches
+    print(f'Matched {matched} of {len(roms)} rom files')
+
+def checkzip(romname):
+    checked = {}
+    with zipfile.ZipFile(romname) as romzip:
+        for zipinfo in romzip.infolist():
+            if zipinfo.is_dir():
+                continue
+            filename = os.path.normpath(zipinfo.filename)
+            info = {}
+            info['size'] = zipinfo.file_size
+            info['name'] = filename
+            with romzip.open(zipinfo) as member:
+                crc, sha1, _ = hashstream(member)
+            info['crc'] = crc
+            info['sha1'] = sha1
+            checked[filename] = info
+    return checked
+
+def checkextracted(romname, workdir):
+    checked = {}
+    with tempzip(romname, workdir) as temp:
+        wildcard = os.path.join(temp, '**\\*')
+        files = glob.glob(wildcard, recursive=True)
+        for file in files:
+            if not os.path.isfile(file):
+                continue
+            filename = file.replace(temp, '')[1:]
+            info = {}
+            size = os.path.getsize(file)
+            info['size'] = size
+            info['name'] = filename
+            crc, sha1 = hashrom(file)
+            info['crc'] = crc
+            info['sha1'] = sha1
+            checked[filename] = info
+    return checked
+
+def checkpiped(romname, members, sevenzip):
+    checked = {}
+    ordered = sorted(members.values(), key=lambda member: member['Index'])
+    command = [sevenzip, 'x', '-so', '-p-', '--', romname]
+    with subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20) as process:
+        for member in ordered:
+            if member.get('Folder') == '+' or member.get('Attributes', '').startswith('D'):
+                continue
+            filename = member['Path']
+            size = member.get('Size')
+            if not size:
+                size = 0
+            crc, sha1, hashed = hashstream(process.stdout, limit=int(size))
+            info = {}
+            info['size'] = hashed
+            info['name'] = filename
+            info['crc'] = crc
+            info['sha1'] = sha1
+            checked[filename] = info
+        while process.stdout.read(1 << 20):
+            pass
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return checked
+
+def checkrom(romname, rominfo, workdir, sevenzip):
+    try:
+        romcheck = {}
+        romcheck['path'] = romname
+        extension = os.path.splitext(romname)[1].lower()
+        if extension == '.zip':
+            try:
+                romcheck['files'] = checkzip(romname)
+            except (NotImplementedError, zipfile.BadZipFile) as e:
+                print(f'{e}, extracting {romname} instead')
+                romcheck['files'] = checkextracted(romname, workdir)
+        elif extension == '.7z':
+            romcheck['files'] = checkpiped(romname, rominfo['files'], sevenzip)
+        else:
+            romcheck['files'] = checkextracted(romname, workdir)
+        return romname, romcheck
+    except Exception as e:
+        print(e)
+        print(f'Bad rom zip {romname}')
+        return None
+    
+def checkroms(roms, sevenzip):
+    with temproot() as temp, ProcessPoolExecutor() as executor:
+        futures = []
+        for index, (romname, rominfo) in enumerate(roms.items()):
+            workdir = os.path.join(temp, str(index))
+            futures.append(executor.submit(checkrom, romname, rominfo, workdir, sevenzip))
+        for future in tqdm(as_completed(futures), total=len(futures), desc='roms', unit='rom', unit_scale=True, mininterval=0.5):
+            result = future.result()
+            if not result:
+                continue
+            yield result
     
 def main():
     parser = ArgumentParser()
@@ -275,37 +491,46 @@ def main():
     args = parser.parse_args()
     if args.list:
         datfiles = finddats()
-        datinfo = pulldata(datfiles)
         print('Saving datfiles JSON')
-        with open('datfiles.json', 'w') as datjson:
-            json.dump(datinfo, datjson, indent=4, sort_keys=True)
-        printinfo(datinfo)
+        for _, dat in streamjson('datfiles.json', pulldata(datfiles)):
+            printinfo(dat)
     elif args.scan:
         locations = ['F:\\emu2-roms\\']
-        romfiles = scanroms(locations)
+        sevenzip = find7z()
         print('Saving romfiles JSON')
-        with open('romfiles.json', 'w') as romjson:
-            json.dump(romfiles, romjson, indent=4, sort_keys=True)
-        printroms(romfiles)
+        printroms(streamjson('romfiles.json', scanroms(locations, sevenzip)))
     elif args.match:
         dats = None
         print('Loading datfiles JSON')
-        with open('datfiles.json', 'r') as datjson:
-            dats = json.load(datjson)
+        with open('datfiles.json', 'rb') as datjson:
+            dats = orjson.loads(datjson.read())
         roms = None
-        print('Loading romfiles JSON')
-        with open('romfiles.json', 'r') as romjson:
-            roms = json.load(romjson)
-        matchroms(dats, roms)
+        romsfile = 'romfiles.json'
+        reason = 'no checkroms.json found'
+        if os.path.exists('checkroms.json'):
+            if not os.path.exists('romfiles.json'):
+                romsfile = 'checkroms.json'
+                reason = 'no romfiles.json found'
+            elif os.path.getmtime('checkroms.json') >= os.path.getmtime('romfiles.json'):
+                romsfile = 'checkroms.json'
+                reason = 'checkroms.json is newer than romfiles.json'
+            else:
+                reason = 'checkroms.json is older than romfiles.json, run --check to refresh it'
+        print(f'Loading {romsfile} ({reason})')
+        with open(romsfile, 'rb') as romjson:
+            roms = orjson.loads(romjson.read())
+        print('Saving matchroms JSON')
+        for _ in streamjson('matchroms.json', matchroms(dats, roms)):
+            pass
     elif args.check:
         roms = None
         print('Loading romfiles JSON')
-        with open('romfiles.json', 'r') as romjson:
-            roms = json.load(romjson)
-        checks = checkroms(roms)
+        with open('romfiles.json', 'rb') as romjson:
+            roms = orjson.loads(romjson.read())
+        sevenzip = find7z()
         print('Saving checkroms JSON')
-        with open('checkroms.json', 'w') as checkjson:
-            json.dump(checks, checkjson, indent=4, sort_keys=True)
+        for _ in streamjson('checkroms.json', checkroms(roms, sevenzip)):
+            pass
     else:
         parser.print_help()
     